@@ -7,7 +7,7 @@ bearer_deps = ['bearer']
 
 extras_require = {
     'adobe': ['adobe_analytics'],
-    'aircall': bearer_deps,
+    'aircall': bearer_deps + ['orjson'],
     'azure_mssql': ['pyodbc>=3'],
     'dataiku': ['dataiku-api-client'],
     'elasticsearch': ['elasticsearch'],
@@ -30,6 +30,7 @@ extras_require = {
     'oracle_sql': ['cx_Oracle>=6.2.1'],
     'postgres': ['psycopg2>=2.7.4'],
     'ROK': ['requests', 'pyjwt', 'simplejson'],
+    'salesforce': ['orjson'],
     'sap_hana': ['pyhdb>=0.3.4'],
     'snowflake': ['snowflake-connector-python', 'pyarrow<0.18'],
     'toucan_toco': ['toucan_client'],
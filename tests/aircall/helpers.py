@@ -9,3 +9,20 @@ def assert_called_with(fake_func, expected_params=[], expected_count=None):
         fake_func.assert_awaited_with(*expected_params)
     else:
         fake_func.assert_awaited_once()
+
+
+def fake_iter_pages(*results):
+    """
+    Builds a side effect replacing iter_pages, yielding the pages of
+    each given result (or raising it if it's an exception) call after call
+    """
+    results = iter(results)
+
+    async def _fake_iter_pages(*args, **kwargs):
+        pages = next(results)
+        if isinstance(pages, Exception):
+            raise pages
+        for page in pages:
+            yield page
+
+    return _fake_iter_pages
@@ -1,6 +1,13 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
 import pytest
+from aiohttp import ClientSession
 from pydantic import ValidationError
 
+from tests.aircall.helpers import fake_iter_pages
 from tests.aircall.mock_results import (
     fake_calls,
     fake_tags,
@@ -18,6 +25,7 @@ from toucan_connectors.aircall.aircall_connector import (
     AircallDataSource,
     NoCredentialsError,
 )
+from toucan_connectors.aircall.constants import MAX_CONCURRENT_REQUESTS
 from toucan_connectors.common import HttpError
 from toucan_connectors.oauth2_connector.oauth2connector import OAuth2Connector
 
@@ -39,7 +47,7 @@ columns_for_tags = ['id', 'name', 'color', 'description']
 columns_for_teams = ['team', 'user_id', 'user_name', 'user_created_at']
 columns_for_users = ['user_id', 'user_name', 'user_created_at']
 
-fetch_fn_name = 'toucan_connectors.aircall.aircall_connector.fetch_page'
+fetch_fn_name = 'toucan_connectors.aircall.aircall_connector.iter_pages'
 FAKE_FETCH_RES = 'FAKE RESULTS'
 
 
@@ -81,6 +89,60 @@ async def test_authentified_fetch(mocker, con):
     assert result == FAKE_FETCH_RES
 
 
+def test_run_fetches_closes_session(con, mocker):
+    """It should fetch both datasets with a single session, closed at the end of the run"""
+    sessions = []
+    sessions_kwargs = []
+
+    def open_session(*args, **kwargs):
+        session = ClientSession(*args, **kwargs)
+        sessions.append(session)
+        sessions_kwargs.append(kwargs)
+        return session
+
+    mocker.patch(f'{import_path}.ClientSession', side_effect=open_session)
+    mocker.patch(fetch_fn_name, side_effect=fake_iter_pages(fake_teams, fake_users))
+    con.run_fetches('users', 1)
+
+    assert len(sessions) == 1
+    assert sessions_kwargs[0]['headers'] == {'Authorization': 'Bearer access_token'}
+    assert sessions[0].closed
+    assert not any(isinstance(value, ClientSession) for value in con.__dict__.values())
+
+
+@pytest.mark.asyncio
+async def test__get_data_bounds_simultaneous_requests(con, mocker):
+    """
+    It should not send more requests at the same time than MAX_CONCURRENT_REQUESTS,
+    for the teams and the dataset together
+    """
+    running = 0
+    max_running = 0
+
+    async def fake_fetch(endpoint, session, query_params=None):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        page = int(endpoint.rsplit('=', 1)[1])
+        return {
+            'teams': [],
+            'users': [],
+            'meta': {
+                'next_page_link': f'/page={page + 1}' if page < 10 else None,
+                'current_page': page,
+                'per_page': 50,
+                'total': 500,
+            },
+        }
+
+    fake = mocker.patch(f'{import_path}.fetch', side_effect=fake_fetch)
+    assert await con._get_data('users', -1) == ([], [])
+    assert fake.await_count == 20
+    assert max_running == MAX_CONCURRENT_REQUESTS
+
+
 def test__run_fetch(mocker, con):
     """It should return a result from loops if all is ok."""
     mocker.patch.object(AircallConnector, '_fetch', return_value=FAKE_FETCH_RES)
@@ -131,7 +193,7 @@ async def test__get_data_tags_case(con, mocker):
     dataset = 'tags'
     fake_res = fake_tags
     fake_res = fake_res
-    fake_fetch_page = mocker.patch(fetch_fn_name, return_value=fake_res)
+    fake_fetch_page = mocker.patch(fetch_fn_name, side_effect=fake_iter_pages(fake_res))
     ds = build_ds(dataset)
     res = await con._get_tags(ds.dataset, 10)
 
@@ -143,7 +205,7 @@ async def test__get_data_tags_case(con, mocker):
 async def test__get_data_tags_unhappy_case(con, mocker):
     """Tests what happens when tags call returns an error"""
     dataset = 'tags'
-    mocker.patch(fetch_fn_name, return_value=Exception('OMGERD OOPS!!!'))
+    mocker.patch(fetch_fn_name, side_effect=fake_iter_pages(Exception('OMGERD OOPS!!!')))
     ds = build_ds(dataset)
     with pytest.raises(Exception):
         await con._get_tags(ds.dataset, 10)
@@ -164,7 +226,7 @@ async def test__get_data_users_case(con, mocker):
     dataset = 'users'
     fake_res = [fake_teams, fake_users]
     fake_res = [item for item in fake_res]
-    fake_fetch_page = mocker.patch(fetch_fn_name, side_effect=fake_res)
+    fake_fetch_page = mocker.patch(fetch_fn_name, side_effect=fake_iter_pages(*fake_res))
     ds = build_ds(dataset)
     res = await con._get_data(ds.dataset, 10)
 
@@ -221,6 +283,14 @@ def test__retrieve_data_tags_happy_case(con, mocker):
     assert list(df.columns) == columns_for_tags
 
 
+def test__retrieve_data_tags_empty_case(con, mocker):
+    """Tests case when tags call has no data"""
+    mocker.patch.object(AircallConnector, 'run_fetches_for_tags', return_value=[])
+    df = con._retrieve_data(build_ds('tags'))
+    assert df.shape == (0, 4)
+    assert list(df.columns) == columns_for_tags
+
+
 def test__retrieve_data_calls_params(con, mocker):
     """Check that calls are correctly retrieved when providing
     start and end_date"""
@@ -238,7 +308,7 @@ async def test__get_data_calls_params(con, mocker):
     ds = build_ds('calls')
     fake_res = [fake_teams, fake_calls]
     fake_res = [item for item in fake_res]
-    fake_fetch_page = mocker.patch(fetch_fn_name, side_effect=fake_res)
+    fake_fetch_page = mocker.patch(fetch_fn_name, side_effect=fake_iter_pages(*fake_res))
     await con._get_data(ds.dataset, 10, query_params={'from': 1609459200, 'to': 1612137599})
     assert fake_fetch_page.call_args_list[0][1]['query_params'] is None
     assert fake_fetch_page.call_args_list[1][1]['query_params'] == {
@@ -262,7 +332,7 @@ def test_run_fetches_for_tags(con, mocker):
     """Tests the loop generator function for tags call"""
     dataset = 'tags'
     spy = mocker.spy(AircallConnector, 'run_fetches_for_tags')
-    mocker.patch(f'{import_path}.fetch_page', return_value=fake_tags)
+    mocker.patch(f'{import_path}.iter_pages', side_effect=fake_iter_pages(fake_tags))
     ds = build_ds(dataset)
     con.run_fetches_for_tags(dataset, ds.limit)
     assert spy.call_count == 1
@@ -272,7 +342,7 @@ def test_run_fetches(con, mocker):
     """Tests the loop generator function for calls/users call"""
     dataset = 'users'
     spy = mocker.spy(AircallConnector, 'run_fetches')
-    mocker.patch(f'{import_path}.fetch_page', return_values=[fake_teams, fake_users])
+    mocker.patch(f'{import_path}.iter_pages', side_effect=fake_iter_pages(fake_teams, fake_users))
     ds = build_ds(dataset)
     con.run_fetches(ds.dataset, ds.limit)
     assert spy.call_count == 1
@@ -293,10 +363,10 @@ def test__retrieve_data_no_teams_case(con, mocker):
 
 
 def test__retrieve_tags_from_fetch(con, mocker):
-    """Tests _retrieve_tags from the fetch_page function"""
+    """Tests _retrieve_tags from the iter_pages function"""
     fake_res = fake_tags
     fake_res = fake_tags
-    mocker.patch(fetch_fn_name, return_value=fake_res)
+    mocker.patch(fetch_fn_name, side_effect=fake_iter_pages(fake_res))
     ds = build_ds('tags')
 
     df = con._retrieve_data(ds)
@@ -309,10 +379,10 @@ def test__retrieve_tags_from_fetch(con, mocker):
 
 
 def test__retrieve_users_from_fetch(con, mocker):
-    """Tests _retrieve_data for users from fetch_page function"""
+    """Tests _retrieve_data for users from iter_pages function"""
     fake_res = [fake_teams, fake_users]
     fake_res = [item for item in fake_res]
-    mocker.patch(fetch_fn_name, side_effect=fake_res)
+    mocker.patch(fetch_fn_name, side_effect=fake_iter_pages(*fake_res))
     ds = build_ds('users')
 
     df = con._retrieve_data(ds)
@@ -431,6 +501,29 @@ def test__run_fetch_no_secret(mocker, con, remove_secrets):
         con._run_fetch('toto')
 
 
+def test_get_access_token_after_retrieve_tokens(mocker, con, secrets_keeper):
+    """
+    check that the access token saved by a new authorization is used right away,
+    even though the previous one was still kept in memory
+    """
+    expires_at = datetime.now() + timedelta(hours=1)
+    state = json.dumps({'token': 'state_token'})
+    secrets_keeper.save(
+        'test', {'access_token': 'access_token', 'expires_at': expires_at, 'state': state}
+    )
+    load = mocker.spy(secrets_keeper, 'load')
+    assert con.get_access_token() == 'access_token'
+    assert con.get_access_token() == 'access_token'
+    assert load.call_count == 1
+
+    mocker.patch(
+        'toucan_connectors.oauth2_connector.oauth2connector.OAuth2Session.fetch_token',
+        return_value={'access_token': 'new_access_token', 'expires_at': expires_at},
+    )
+    con.retrieve_tokens(f'https://redirect.me/?code=code&state={quote(state)}')
+    assert con.get_access_token() == 'new_access_token'
+
+
 def test_get_access_token_provided(mocker, con):
     """
     check that get access_token returns the provided token
@@ -1,16 +1,22 @@
 """Module containing tests with fake server"""
+import asyncio
 from datetime import datetime
 
 import pytest
 from aiohttp import web
 
 from tests.aircall.helpers import assert_called_with
+from toucan_connectors.aircall import aircall_connector
 from toucan_connectors.aircall.aircall_connector import (
     AircallDataset,
     AircallRateLimitExhaustedException,
     fetch,
     fetch_page,
+    fetch_single_page,
+    iter_pages,
+    iter_pages_concurrently,
 )
+from toucan_connectors.aircall.constants import MAX_CONCURRENT_REQUESTS
 
 fetch_fn_name = 'toucan_connectors.aircall.aircall_connector.fetch'
 
@@ -45,6 +51,18 @@ async def test_fetch(aiohttp_client, loop):
     assert res == FAKE_DATA
 
 
+async def test_fetch_without_orjson(aiohttp_client, loop, mocker):
+    """It should still decode the response when orjson is not installed."""
+    mocker.patch('toucan_connectors.aircall.aircall_connector.orjson', None)
+    app = web.Application(loop=loop)
+    app.router.add_get('/foo', send_200_success)
+
+    client = await aiohttp_client(app)
+    res = await fetch('/foo', client)
+
+    assert res == FAKE_DATA
+
+
 async def test_fetch_limit(aiohttp_client, loop):
     """It should raise an AircallRateLimitExhaustedException"""
     app = web.Application(loop=loop)
@@ -150,6 +168,96 @@ async def test_fetch_page_with_low_limit(mocker):
     assert_called_with(fake_fetch, ['https://api.aircall.io/v1/users?per_page=50&page=1', {}])
 
 
+async def test_fetch_page_with_total(mocker):
+    """Test fetch_page fetches all the remaining pages when the total is known"""
+    dataset = 'calls'
+
+    def fake_page(endpoint, session):
+        page = int(endpoint.rsplit('=', 1)[1])
+        return {
+            'data': {'page': page},
+            'meta': {
+                'next_page_link': f'/calls?page={page + 1}' if page < 3 else None,
+                'current_page': page,
+                'per_page': 50,
+                'total': 120,
+            },
+        }
+
+    fake_fetch = mocker.patch(fetch_fn_name, side_effect=fake_page)
+    res = await fetch_page(dataset, [], {}, 10, 0)
+    assert [data['data']['page'] for data in res] == [1, 2, 3]
+    assert fake_fetch.await_count == 3
+    fake_fetch.assert_any_await('https://api.aircall.io/v1/calls?per_page=50&page=2', {})
+    fake_fetch.assert_any_await('https://api.aircall.io/v1/calls?per_page=50&page=3', {})
+
+
+async def test_iter_pages_with_total_streams_pages(mocker):
+    """
+    Test iter_pages yields each of the remaining pages as soon as it is received,
+    instead of waiting for all of them
+    """
+    last_page_released = asyncio.Event()
+
+    async def fake_page(endpoint, session):
+        page = int(endpoint.rsplit('=', 1)[1])
+        if page == 20:
+            await last_page_released.wait()
+        return {
+            'data': {'page': page},
+            'meta': {
+                'next_page_link': f'/calls?page={page + 1}' if page < 20 else None,
+                'current_page': page,
+                'per_page': 50,
+                'total': 1000,
+            },
+        }
+
+    fake_fetch = mocker.patch(fetch_fn_name, side_effect=fake_page)
+    pages = iter_pages('calls', {}, -1)
+    assert [(await pages.__anext__())['data']['page'] for _ in range(19)] == list(range(1, 20))
+
+    last_page_released.set()
+    assert [data['data']['page'] async for data in pages] == [20]
+    assert fake_fetch.await_count == 20
+
+
+async def test_iter_pages_builds_base_endpoint_once(mocker):
+    """Test iter_pages builds the URL prefix of the dataset once for all its pages"""
+    fake_data = {
+        'data': {'stuff': 'stuff'},
+        'meta': {
+            'next_page_link': '/calls?page=2',
+            'current_page': 1,
+            'per_page': 50,
+            'total': 150,
+        },
+    }
+    fake_fetch = mocker.patch(fetch_fn_name, return_value=fake_data)
+    spy = mocker.spy(aircall_connector, 'get_base_endpoint')
+    assert len([data async for data in iter_pages('calls', {}, -1)]) == 3
+    assert spy.call_count == 1
+    fake_fetch.assert_any_await('https://api.aircall.io/v1/calls?per_page=50&page=3', {})
+
+
+async def test_fetch_page_with_total_and_limit(mocker):
+    """Test fetch_page does not fetch more pages than the limit when the total is known"""
+    dataset = 'calls'
+    fake_data = {
+        'data': {'stuff': 'stuff'},
+        'meta': {
+            'next_page_link': '/calls?page=2',
+            'current_page': 1,
+            'per_page': 50,
+            'total': 6649,
+        },
+    }
+    fake_fetch = mocker.patch(fetch_fn_name, return_value=fake_data)
+    res = await fetch_page(dataset, [], {}, 3, 0)
+    assert len(res) == 3
+    assert fake_fetch.await_count == 3
+
+
 async def test_fetch_page_with_no_meta(mocker):
     """Tests that no meta object in response is not an issue"""
     dataset = 'calls'
@@ -176,6 +284,20 @@ async def test_fetch_page_with_error(mocker):
     assert str(e.value) == 'Aborting Aircall requests due to Oops!'
 
 
+async def test_fetch_page_with_error_then_success(mocker):
+    """
+    Tests that a page is fetched again after an error and that the error is not kept in the results
+    """
+    dataset = 'tags'
+    fake_error = {'error': 'Oops!', 'troubleshoot': 'Blah blah blah'}
+    fake_data = {'data': {'stuff': 'stuff'}, 'meta': {'next_page_link': None, 'current_page': 1}}
+    fake_fetch = mocker.patch(fetch_fn_name, side_effect=[fake_error, fake_data])
+    mocker.patch('toucan_connectors.aircall.aircall_connector.asyncio.sleep')
+    res = await fetch_page(dataset, [], {}, 10, 0)
+    assert res == [fake_data]
+    assert fake_fetch.await_count == 2
+
+
 async def test_fetch_page_with_params(mocker):
     """
     Tests fetch page providing start & end dates
@@ -214,7 +336,54 @@ async def test_fetch_page_rate_limited(mocker):
     mocked_utcnow.return_value = datetime(2021, 1, 7, 6, 13, 20)
     mocked_timestamp = mockeddatetime.timestamp
     mocked_timestamp.return_value = 1610000001
-    mockedsleep = mocker.patch('toucan_connectors.aircall.aircall_connector.time.sleep')
+    mockedsleep = mocker.patch('toucan_connectors.aircall.aircall_connector.asyncio.sleep')
     await fetch_page(ds, [], 'session', 0, 0, 0, 0)
-    mockedsleep.assert_called_once()
+    mockedsleep.assert_awaited_once()
     assert mockedsleep.call_args_list[0][0][0] == 1
+
+
+async def test_fetch_single_page_rate_limit_already_reset(mocker):
+    """
+    Check that fetch_single_page doesn't pause with a negative delay
+    if the rate limit was reset while another page was waiting
+    """
+    fake_data = {'data': {'stuff': 'stuff'}}
+    fake_fetch = mocker.patch(
+        fetch_fn_name, side_effect=[AircallRateLimitExhaustedException('1610000000'), fake_data]
+    )
+    mockeddatetime = mocker.patch('toucan_connectors.aircall.aircall_connector.datetime')
+    mockeddatetime.timestamp.return_value = 1610000005
+    mockedsleep = mocker.patch('toucan_connectors.aircall.aircall_connector.asyncio.sleep')
+    res = await fetch_single_page('calls', 'session', 2)
+    assert res == fake_data
+    mockedsleep.assert_awaited_once_with(0)
+    assert_called_with(
+        fake_fetch, ['https://api.aircall.io/v1/calls?per_page=50&page=2', 'session'], 2
+    )
+
+
+async def test_iter_pages_concurrently_is_bounded(mocker):
+    """
+    Check that iter_pages_concurrently yields the pages in order
+    without sending more requests at the same time than the semaphore allows
+    """
+    running = 0
+    max_running = 0
+
+    async def fake_fetch(endpoint, session):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {'data': {'page': int(endpoint.rsplit('=', 1)[1])}}
+
+    mocker.patch(fetch_fn_name, side_effect=fake_fetch)
+    res = [
+        data
+        async for data in iter_pages_concurrently(
+            'calls', 'session', range(1, 21), asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        )
+    ]
+    assert [data['data']['page'] for data in res] == list(range(1, 21))
+    assert max_running == MAX_CONCURRENT_REQUESTS
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 
 import pytest
@@ -155,6 +156,10 @@ def test_get_oauth_doc(gc):
     """
     form = GithubConnector.get_connector_secrets_form()
     assert len(form.documentation_md) > 0
+    # the doc is only read once
+    assert GithubConnector.get_connector_secrets_form() is form
+    with pytest.raises(TypeError):
+        form.documentation_md = ''
 
 
 def test_get_names(
@@ -275,6 +280,33 @@ def test_fetch_members_data(
     assert len(members_dataset) == 5
 
 
+def test_fetch_data_bounded_concurrency(mocker, gc, client, event_loop):
+    """
+    Check that _fetch_data doesn't paginate more names at the same time
+    than MAX_CONCURRENT_QUERIES
+    """
+    mocker.patch('toucan_connectors.github.github_connector.MAX_CONCURRENT_QUERIES', 2)
+    mocker.patch.object(
+        GithubConnector, 'get_names', return_value=['team1', 'team2', 'team3', 'team4']
+    )
+    running = []
+    max_running = []
+
+    async def fake_get_pages(name, **kwargs):
+        running.append(name)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(name)
+        return [{name: 'Dev'}]
+
+    mocker.patch.object(GithubConnector, 'get_pages', side_effect=fake_get_pages)
+    event_loop.run_until_complete(
+        gc._fetch_data(dataset='teams', organization='foorganization', client=client, page_limit=1)
+    )
+    assert len(max_running) == 4
+    assert max(max_running) == 2
+
+
 def test_fetch_pull_requests_data(
     mocker,
     gc,
@@ -525,6 +557,44 @@ def test_get_organizations(gc):
     assert res == ['power_rangers', 'teletubbies']
 
 
+@responses.activate
+def test_get_organizations_pages(gc):
+    """Check that get_organizations follows the pages linked in the response headers"""
+    responses.add(
+        responses.GET,
+        'https://api.github.com/user/orgs?per_page=100',
+        json=[{'login': 'power_rangers'}],
+        headers={'Link': '<https://api.github.com/user/orgs?per_page=100&page=2>; rel="next"'},
+        match_querystring=True,
+    )
+    responses.add(
+        responses.GET,
+        'https://api.github.com/user/orgs?per_page=100&page=2',
+        json=[{'login': 'teletubbies'}],
+        match_querystring=True,
+    )
+    res = gc.get_organizations()
+    assert len(responses.calls) == 2
+    assert res == ['power_rangers', 'teletubbies']
+
+
+def test_get_organizations_session(gc, mocker):
+    """Check that get_organizations retrieves all the pages with one session, closed at the end"""
+    session_cls = mocker.patch('toucan_connectors.github.github_connector.requests.Session')
+    session = session_cls.return_value.__enter__.return_value
+    first_page = mocker.Mock(links={'next': {'url': 'https://api.github.com/user/orgs?page=2'}})
+    first_page.json.return_value = [{'login': 'power_rangers'}]
+    second_page = mocker.Mock(links={})
+    second_page.json.return_value = [{'login': 'teletubbies'}]
+    session.get.side_effect = [first_page, second_page]
+
+    assert gc.get_organizations() == ['power_rangers', 'teletubbies']
+    assert session_cls.call_count == 1
+    assert session.get.call_count == 2
+    session_cls.return_value.__exit__.assert_called_once()
+    assert '_rest_session' not in gc.__dict__
+
+
 def test_get_rate_limit_exhausted(gc, mocker, extracted_prs_4, extracted_prs_3, event_loop, client):
     """Check that the connector is paused when rate limit is exhausted"""
     mockedsleep = mocker.patch('toucan_connectors.github.github_connector.asyncio.sleep')
@@ -28,6 +28,7 @@ from toucan_connectors.github.helpers import (
     get_team,
     get_teams,
     has_next_page,
+    pluck,
 )
 
 
@@ -89,6 +90,25 @@ def test_format_pr_row_no_commits(extracted_pr_no_commits):
     assert formatted['Dev'] is None
 
 
+def test_format_pr_row_no_user(extracted_pr_no_commits_2):
+    """
+    Check that the function doesn't get dev's name as the commit
+    has no user
+    """
+    formatted = format_pr_row(extracted_pr_no_commits_2)
+    assert formatted['PR Type'] == ['foo']
+    assert formatted['Dev'] is None
+
+
+def test_format_pr_row_no_labels(extracted_pr):
+    """
+    Check that the dev's name is still extracted when labels are missing
+    """
+    formatted = format_pr_row({**extracted_pr, 'labels': None})
+    assert formatted['PR Type'] == []
+    assert formatted['Dev'] == 'okidoki'
+
+
 def test_format_pr_rows(extracted_pr_list):
     """
     Check that format_pr_rows is able to format a list of prs
@@ -121,6 +141,20 @@ def test_format_team_df(team_rows):
     assert 'faketeam' in (formatted[formatted['Dev'] == 'barfoo']['teams'].values[0])
 
 
+def test_pluck():
+    """
+    Check that pluck is able to retrieve a value from nested dicts
+    and raises an error when a key on the path is not available
+    """
+    response = {'data': {'organization': {'team': {'members': 'members'}}}}
+    assert pluck(response, 'data', 'organization', 'team', 'members') == 'members'
+    assert pluck(response, 'data') == response['data']
+    with pytest.raises(KeyNotFoundException, match='No repository Key Available'):
+        pluck(response, 'data', 'organization', 'repository', 'pullRequests')
+    with pytest.raises(KeyNotFoundException):
+        pluck({'data': {}}, 'data', 'organization')
+
+
 def test_get_data():
     """
     Check that get_data is able to retrieve the
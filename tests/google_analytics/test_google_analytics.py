@@ -1,15 +1,30 @@
 import json
 
 import pytest
+import responses
 
 from toucan_connectors.google_analytics.google_analytics_connector import (
+    SCOPE,
     GoogleAnalyticsConnector,
     GoogleAnalyticsDataSource,
+    get_dict_from_response,
+    get_discovery_document,
+    get_page_tokens,
 )
 
+MODULE = 'toucan_connectors.google_analytics.google_analytics_connector'
 
-def test_google_analytics(mocker):
-    gac = GoogleAnalyticsConnector(
+
+@pytest.fixture(autouse=True)
+def clear_discovery_document_cache():
+    get_discovery_document.cache_clear()
+    yield
+    get_discovery_document.cache_clear()
+
+
+@pytest.fixture
+def gac():
+    return GoogleAnalyticsConnector(
         type='GoogleAnalytics',
         name='Test',
         credentials={
@@ -26,6 +41,33 @@ def test_google_analytics(mocker):
         },
     )
 
+
+@pytest.fixture
+def reports_fixture():
+    with open('tests/google_analytics/fixtures/reports.json') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def get_query_results(mocker, reports_fixture):
+    """Mocks the reporting service, whose queries return the first report of the fixture"""
+    mocker.patch(f'{MODULE}.ServiceAccountCredentials.from_json_keyfile_dict')
+    mocker.patch(f'{MODULE}.get_discovery_document')
+    mocker.patch(f'{MODULE}.build_from_document')
+    return mocker.patch(f'{MODULE}.get_query_results', return_value=reports_fixture['reports'][0])
+
+
+@pytest.fixture
+def get_pages_results(mocker, reports_fixture):
+    """Mocks the batched page queries, returning the first report of the fixture for each page"""
+    report = reports_fixture['reports'][0]
+    return mocker.patch(
+        f'{MODULE}.get_pages_results',
+        side_effect=lambda service, request, tokens: [report] * len(tokens),
+    )
+
+
+def test_google_analytics(gac, get_query_results):
     gads = GoogleAnalyticsDataSource(
         name='Test',
         domain='test',
@@ -35,14 +77,184 @@ def test_google_analytics(mocker):
         },
     )
 
-    fixture = json.load(open('tests/google_analytics/fixtures/reports.json'))
-    module = 'toucan_connectors.google_analytics.google_analytics_connector'
-    mocker.patch(f'{module}.ServiceAccountCredentials.from_json_keyfile_dict')
-    mocker.patch(f'{module}.build')
-    mocker.patch(f'{module}.get_query_results').return_value = fixture['reports'][0]
-
     df = gac.get_df(gads)
     assert df.shape == (3, 11)
+    assert df['row_index'].dtype == 'int32'
+    assert df['date_range_id'].dtype == 'int16'
+
+
+def test_google_analytics_batched_pages(gac, reports_fixture, get_query_results, get_pages_results):
+    gads = GoogleAnalyticsDataSource(
+        name='Test',
+        domain='test',
+        report_request={'viewId': '0123456789', 'pageSize': 1},
+    )
+
+    first_page = {**reports_fixture['reports'][0], 'nextPageToken': '1'}
+    first_page['data'] = {**first_page['data'], 'rowCount': 7}
+    get_query_results.return_value = first_page
+
+    df = gac.get_df(gads)
+    assert df.shape == (21, 9)
+    assert df.index.tolist() == list(range(21))
+    assert [c[0][2] for c in get_pages_results.call_args_list] == [
+        ['1', '2', '3', '4', '5'],
+        ['6'],
+    ]
+
+
+def test_google_analytics_pages_shorter_than_page_size(
+    gac, reports_fixture, get_query_results, get_pages_results
+):
+    gads = GoogleAnalyticsDataSource(
+        name='Test',
+        domain='test',
+        report_request={'viewId': '0123456789', 'pageSize': 200000},
+    )
+
+    # the API returns at most 100000 rows per page, whatever the requested page size
+    first_page = {**reports_fixture['reports'][0], 'nextPageToken': '100000'}
+    first_page['data'] = {**first_page['data'], 'rowCount': 350000}
+    get_query_results.return_value = first_page
+
+    gac.get_df(gads)
+    assert [c[0][2] for c in get_pages_results.call_args_list] == [['100000', '200000', '300000']]
+
+
+def test_google_analytics_serial_pages(gac, reports_fixture, get_query_results):
+    gads = GoogleAnalyticsDataSource(
+        name='Test', domain='test', report_request={'viewId': '0123456789'}
+    )
+
+    pages = [
+        {**reports_fixture['reports'][0], 'nextPageToken': 'a'},
+        {**reports_fixture['reports'][0], 'nextPageToken': 'b'},
+        reports_fixture['reports'][0],
+    ]
+    page_tokens = []
+
+    def get_page(service, report_request):
+        page_tokens.append(report_request['pageToken'])
+        return pages[len(page_tokens) - 1]
+
+    get_query_results.side_effect = get_page
+
+    df = gac.get_df(gads)
+    assert df.shape == (9, 9)
+    assert page_tokens == ['', 'a', 'b']
+
+
+def test_google_analytics_parameters(gac, get_query_results):
+    gads = GoogleAnalyticsDataSource(
+        name='Test',
+        domain='test',
+        report_request={
+            'viewId': '%(view_id)s',
+            'dateRanges': [{'startDate': '{{ start }}', 'endDate': '2018-07-01'}],
+        },
+        parameters={'view_id': '0123456789', 'start': '2018-06-01'},
+    )
+
+    df = gac.get_df(gads)
+    body = get_query_results.call_args[0][1]
+    assert body['viewId'] == '0123456789'
+    assert body['dateRanges'] == [{'startDate': '2018-06-01', 'endDate': '2018-07-01'}]
+    assert df['start_date'].unique().tolist() == ['2018-06-01']
+
+
+def test_google_analytics_service_per_fetch(mocker, gac, get_query_results):
+    gads = GoogleAnalyticsDataSource(
+        name='Test', domain='test', report_request={'viewId': '0123456789'}
+    )
+
+    from_json_keyfile_dict = mocker.patch(
+        f'{MODULE}.ServiceAccountCredentials.from_json_keyfile_dict'
+    )
+    discovery_document = mocker.patch(f'{MODULE}.get_discovery_document')
+    build_from_document = mocker.patch(f'{MODULE}.build_from_document')
+
+    gac_dict = gac.dict()
+    gac.get_df(gads)
+    gac.scope = ['https://www.googleapis.com/auth/analytics']
+    gac.get_df(gads)
+    # each fetch gets its own service, built from the discovery document fetched once
+    assert build_from_document.call_count == 2
+    build_from_document.assert_called_with(
+        discovery_document.return_value, credentials=from_json_keyfile_dict.return_value
+    )
+    assert discovery_document.call_count == 2
+    assert get_query_results.call_args[0][0] is build_from_document.return_value
+    from_json_keyfile_dict.assert_called_with(
+        gac.credentials.dict(), ['https://www.googleapis.com/auth/analytics']
+    )
+    # the service is not kept on the connector itself
+    gac.scope = [SCOPE]
+    assert gac.dict() == gac_dict
+
+
+@responses.activate
+def test_get_discovery_document():
+    url = 'https://www.googleapis.com/discovery/v1/apis/analyticsreporting/v4/rest'
+    responses.add(responses.GET, url, body='{"name": "analyticsreporting"}')
+    assert get_discovery_document() == '{"name": "analyticsreporting"}'
+    assert get_discovery_document() == '{"name": "analyticsreporting"}'
+    assert len(responses.calls) == 1
+
+
+def test_get_page_tokens():
+    report = {'data': {'rowCount': 300}, 'nextPageToken': '200'}
+    assert get_page_tokens(report, '100') == ['200']
+    assert get_page_tokens(report, '') == ['200']
+    # the offsets can't be computed from tokens that are not row offsets
+    assert get_page_tokens(report, 'abc') is None
+    assert get_page_tokens({**report, 'nextPageToken': 'abc'}, '') is None
+    assert get_page_tokens({'data': {}, 'nextPageToken': '200'}, '') is None
+
+
+def test_get_dict_from_response():
+    report = {
+        'columnHeader': {
+            'dimensions': ['ga:date'],
+            'metricHeader': {
+                'metricHeaderEntries': [
+                    {'name': 'ga:sessions', 'type': 'INTEGER'},
+                    {'name': 'ga:sessionDuration', 'type': 'FLOAT'},
+                ]
+            },
+        },
+        'data': {
+            'rows': [
+                {
+                    'dimensions': ['20180701'],
+                    'metrics': [{'values': ['1', '9.5']}, {'values': ['2', '3.0']}],
+                },
+                {
+                    'dimensions': ['20180702'],
+                    'metrics': [{'values': ['3', '0.5']}, {'values': ['4', '1.0']}],
+                },
+            ]
+        },
+    }
+    date_ranges = [
+        ('2018-07-01', '2018-07-02'),
+        ('2017-07-01', '2017-07-02'),
+    ]
+
+    res = get_dict_from_response(report, date_ranges)
+    assert res['row_index'].tolist() == [0, 0, 0, 0, 1, 1, 1, 1]
+    assert res['date_range_id'].tolist() == [0, 0, 1, 1, 0, 0, 1, 1]
+    assert res['metric_name'].tolist() == ['ga:sessions', 'ga:sessionDuration'] * 4
+    assert res['metric_value'].tolist() == [1, 9.5, 2, 3.0, 3, 0.5, 4, 1.0]
+    assert (
+        res['start_date'].tolist() == ['2018-07-01', '2018-07-01', '2017-07-01', '2017-07-01'] * 2
+    )
+    assert res['ga:date'].tolist() == ['20180701'] * 4 + ['20180702'] * 4
+
+    # the report has more date ranges than requested
+    res = get_dict_from_response(report, date_ranges[:1])
+    assert res['end_date'].tolist() == ['2018-07-02', '2018-07-02', None, None] * 2
+
+    assert get_dict_from_response({'columnHeader': {}, 'data': {}}, date_ranges) == {}
 
 
 @pytest.mark.skip(reason='This uses a live instance')
@@ -1,5 +1,6 @@
 import json
 from datetime import datetime
+from time import time
 from unittest.mock import Mock
 
 import pytest
@@ -8,6 +9,7 @@ from toucan_connectors.google_sheets_2.google_sheets_2_connector import GoogleSh
 from toucan_connectors.http_api.http_api_connector import HttpAPIConnector
 from toucan_connectors.oauth2_connector.oauth2connector import (
     AuthFlowNotFound,
+    InvalidOAuth2State,
     NoOAuth2RefreshToken,
     OAuth2Connector,
     OAuth2ConnectorConfig,
@@ -70,7 +72,7 @@ def test_fail_retrieve_tokens(oauth2_connector, secrets_keeper):
     """
     secrets_keeper.save('test', {'state': json.dumps({'token': 'the_token'})})
 
-    with pytest.raises(AssertionError):
+    with pytest.raises(InvalidOAuth2State):
         oauth2_connector.retrieve_tokens(
             f'http://localhost/?state={json.dumps({"token": "bad_token"})}'
         )
@@ -106,6 +108,71 @@ def test_get_access_token_expired(mocker, oauth2_connector, secrets_keeper):
     assert access_token == 'new_token'
 
 
+def test_get_access_token_cached(mocker, oauth2_connector, secrets_keeper):
+    """
+    It should not load the token again while it is far from expiring
+    """
+    secrets_keeper.save(
+        'test',
+        {'access_token': 'dummy_token', 'expires_at': datetime.fromtimestamp(time() + 3600)},
+    )
+    spy_load = mocker.spy(secrets_keeper, 'load')
+
+    assert oauth2_connector.get_access_token() == 'dummy_token'
+    assert oauth2_connector.get_access_token() == 'dummy_token'
+    assert spy_load.call_count == 1
+
+    # a new authorization flow invalidates the cached token
+    secrets_keeper.save('test', {'state': json.dumps({'token': 'the_token'})})
+    mocker.patch(
+        'toucan_connectors.oauth2_connector.oauth2connector.OAuth2Session.fetch_token',
+        return_value={'access_token': 'new_token'},
+    )
+    oauth2_connector.retrieve_tokens(
+        f'http://localhost/?state={json.dumps({"token": "the_token"})}'
+    )
+    assert oauth2_connector.get_access_token() == 'new_token'
+
+
+def test_get_access_token_about_to_expire(mocker, oauth2_connector, secrets_keeper):
+    """
+    It should keep loading the token when it expires soon
+    """
+    secrets_keeper.save(
+        'test', {'access_token': 'dummy_token', 'expires_at': datetime.fromtimestamp(time() + 10)}
+    )
+    spy_load = mocker.spy(secrets_keeper, 'load')
+
+    assert oauth2_connector.get_access_token() == 'dummy_token'
+    assert oauth2_connector.get_access_token() == 'dummy_token'
+    assert spy_load.call_count == 2
+
+
+def test_get_access_token_expired_reuses_client(mocker, oauth2_connector, secrets_keeper):
+    """
+    It should create the client used to refresh tokens only once
+    """
+    expired_token = {
+        'access_token': 'dummy_token',
+        'expires_at': datetime.fromtimestamp(0),
+        'refresh_token': 'dummy_refresh_token',
+    }
+    mock_session: Mock = mocker.patch(
+        'toucan_connectors.oauth2_connector.oauth2connector.OAuth2Session'
+    )
+    mock_session.return_value.refresh_token.side_effect = [
+        {'access_token': 'new_token_1'},
+        {'access_token': 'new_token_2'},
+    ]
+
+    secrets_keeper.save('test', expired_token)
+    assert oauth2_connector.get_access_token() == 'new_token_1'
+    secrets_keeper.save('test', expired_token)
+    assert oauth2_connector.get_access_token() == 'new_token_2'
+    assert mock_session.call_count == 1
+    assert secrets_keeper.load('test') == {'access_token': 'new_token_2'}
+
+
 def test_get_access_token_expired_no_refresh_token(mocker, oauth2_connector, secrets_keeper):
     """
     It should fail to refresh the token if no refresh token is provided
@@ -20,6 +20,14 @@ def sc(secrets_keeper):
     )
 
 
+@pytest.fixture
+def clear_secrets_form_cache():
+    """The secrets form is cached once built: build it again during the test, and after it"""
+    SalesforceConnector.get_connector_secrets_form.cache_clear()
+    yield
+    SalesforceConnector.get_connector_secrets_form.cache_clear()
+
+
 @pytest.fixture
 def remove_secrets(secrets_keeper, sc):
     secrets_keeper.save('test', {'access_token': None})
@@ -59,6 +59,20 @@ def test_make_request(sc, ds):
     }
 
 
+@responses.activate
+def test_make_request_without_orjson(mocker, sc, ds):
+    """Check that the response is still decoded when orjson is not installed"""
+    mocker.patch(f'{import_path}.orjson', None)
+    responses.add(
+        responses.GET,
+        'https://salesforce.is.awsome/services/data/v39.0/query',
+        json={'records': [{'id': 1, 'name': 'a'}]},
+    )
+
+    resp = sc.make_request(Session(), ds, 'services/data/v39.0/query')
+    assert resp == {'records': [{'id': 1, 'name': 'a'}]}
+
+
 def test_get_status_no_secrets(sc, remove_secrets):
     """
     Check that the connection status is false when no secret is defined
@@ -132,7 +146,7 @@ def test__retrieve_data(mocker, sc, ds, clean_p1):
     assert res.iloc[0]['Id'] == 'A111FA'
 
 
-def test_get_secrets_form(mocker, sc):
+def test_get_secrets_form(mocker, sc, clear_secrets_form_cache):
     """Check that the doc for oAuth setup is correctly retrieved"""
     mocker.patch(
         'toucan_connectors.salesforce.salesforce_connector.os.path.dirname', return_value='fakepath'
@@ -131,3 +131,22 @@ def test_mix_attempts_and_max_delay():
     assert len(logbook) == 5
     last_time = logbook[-1]
     assert_elapsed(approx_start, last_time, 2)
+
+
+def test_custom_tny_parameter_in_subclass():
+    class CustomRetryPolicy(RetryPolicy):
+        @property
+        def tny_before_sleep(self):
+            return lambda retry_state: logbook.append('sleeping')
+
+    retry_policy = CustomRetryPolicy(max_attempts=2)
+    logbook = []
+
+    @retry_policy.retry_decorator()
+    def myfunc():
+        if not logbook:
+            logbook.append(None)
+            raise RuntimeError('try again!')
+
+    myfunc()
+    assert logbook == [None, 'sleeping']
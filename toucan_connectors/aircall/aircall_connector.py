@@ -1,11 +1,12 @@
 import asyncio
 import logging
+import math
 import os
-import time
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
 
 import pandas as pd
 from aiohttp import ClientSession
@@ -23,14 +24,20 @@ from toucan_connectors.toucan_connector import (
     ToucanDataSource,
 )
 
-from .constants import MAX_RUNS, PER_PAGE
+from .constants import FORMATTED_COLUMNS, MAX_CONCURRENT_REQUESTS, MAX_RUNS, PER_PAGE
 from .helpers import DICTIONARY_OF_FORMATTERS, build_df, build_empty_df
 
+try:
+    import orjson
+except ImportError:  # orjson is optional: fall back on aiohttp's json decoding
+    orjson = None
+
 AUTHORIZATION_URL: str = 'https://dashboard-v2.aircall.io/oauth/authorize'
 SCOPE: str = 'public_api'
 TOKEN_URL: str = 'https://api.aircall.io/v1/oauth/token'
 BASE_ROUTE: str = 'https://api.aircall.io/v1'
 NO_CREDENTIALS_ERROR = 'No credentials'
+LOGGER = logging.getLogger(__name__)
 
 
 class AircallRateLimitExhaustedException(Exception):
@@ -47,100 +54,141 @@ class AircallDataset(str, Enum):
     users = 'users'
 
 
-async def fetch_page(
+async def fetch_single_page(
     dataset: str,
-    data_list: List[dict],
     session: ClientSession,
-    limit,
-    current_pass: int,
-    new_page=1,
+    page: int,
     delay_counter=0,
     *,
     query_params=None,
-) -> List[dict]:
+    base_endpoint: Optional[str] = None,
+) -> dict:
     """
-    Fetches data from AirCall API
+    Fetches one page of a dataset from AirCall API
 
-    dependent on existence of other pages and call limit
+    the page is requested again if the rate limit is reached or if Aircall returns an error
+    base_endpoint is the URL of the dataset's pages without the page number, built if not given
     """
-    endpoint = f'{BASE_ROUTE}/{dataset}?per_page={PER_PAGE}&page={new_page}'
-    try:
-        if query_params:
-            data: dict = await fetch(endpoint, session, query_params)
-        else:
-            data: dict = await fetch(endpoint, session)
+    delay_timer = 1
+    max_num_of_retries = 3
+    if base_endpoint is None:
+        base_endpoint = get_base_endpoint(dataset)
+    endpoint = f'{base_endpoint}{page}'
 
-        logging.getLogger(__name__).info(
-            f'Request sent to Aircall for page {new_page} for dataset {dataset}'
-        )
+    while True:
+        try:
+            if query_params:
+                data: dict = await fetch(endpoint, session, query_params)
+            else:
+                data: dict = await fetch(endpoint, session)
+        except AircallRateLimitExhaustedException as a:
+            reset_timestamp = int(a.args[0])
+            delay = reset_timestamp - (int(datetime.timestamp(datetime.utcnow())) + 1)
+            LOGGER.info(f'Rate limit reached, pausing {delay} seconds')
+            # other pages may be fetched at the same time: don't block the event loop
+            await asyncio.sleep(max(delay, 0))
+            LOGGER.info('Extraction restarted')
+            continue
+
+        LOGGER.info('Request sent to Aircall for page %s for dataset %s', page, dataset)
 
         aircall_error = data.get('error')
         if aircall_error:
-            logging.getLogger(__name__).error(f'Aircall error has occurred: {aircall_error}')
-            delay_timer = 1
-            max_num_of_retries = 3
+            LOGGER.error(f'Aircall error has occurred: {aircall_error}')
             await asyncio.sleep(delay_timer)
             if delay_counter < max_num_of_retries:
                 delay_counter += 1
-                logging.getLogger(__name__).info('Retrying Aircall API')
-                data_list = await fetch_page(
-                    dataset,
-                    data_list,
-                    session,
-                    limit,
-                    current_pass,
-                    new_page,
-                    delay_counter,
-                    query_params=query_params,
-                )
-            else:
-                logging.getLogger(__name__).error('Aborting Aircall requests')
-                raise AircallException(f'Aborting Aircall requests due to {aircall_error}')
+                LOGGER.info('Retrying Aircall API')
+                continue
+            LOGGER.error('Aborting Aircall requests')
+            raise AircallException(f'Aborting Aircall requests due to {aircall_error}')
+
+        return data
 
+
+async def iter_pages(
+    dataset: str,
+    session: ClientSession,
+    limit,
+    current_pass: int = 0,
+    new_page=1,
+    delay_counter=0,
+    *,
+    query_params=None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> AsyncIterator[dict]:
+    """
+    Fetches data from AirCall API and yields it page by page
+
+    dependent on existence of other pages and call limit
+    the semaphore bounds the number of simultaneous requests, it can be shared by several fetches
+    """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    # only the page number changes from one request to the other
+    base_endpoint = get_base_endpoint(dataset)
+
+    while True:
+        async with semaphore:
+            data = await fetch_single_page(
+                dataset,
+                session,
+                new_page,
+                delay_counter,
+                query_params=query_params,
+                base_endpoint=base_endpoint,
+            )
         delay_counter = 0
-        data_list.append(data)
+        yield data
 
-        next_page_link = None
-        meta_data = data.get('meta')
-        if meta_data is not None:
-            next_page_link: Optional[str] = meta_data.get('next_page_link')
+        meta_data = data.get('meta') or {}
+        next_page_link: Optional[str] = meta_data.get('next_page_link')
 
         if limit > -1:
             current_pass += 1
 
-            if next_page_link is not None and current_pass < limit:
-                next_page = meta_data['current_page'] + 1
-                data_list = await fetch_page(
-                    dataset,
-                    data_list,
-                    session,
-                    limit,
-                    current_pass,
-                    next_page,
-                    query_params=query_params,
-                )
-        else:
-            if next_page_link is not None:
-                next_page = meta_data['current_page'] + 1
-                data_list = await fetch_page(
-                    dataset,
-                    data_list,
-                    session,
-                    limit,
-                    current_pass,
-                    next_page,
-                    query_params=query_params,
-                )
+        if next_page_link is None or (limit > -1 and current_pass >= limit):
+            return
+
+        next_page = meta_data['current_page'] + 1
+        last_page = get_last_page(meta_data)
+        if last_page is not None:
+            # the total amount of pages is known: fetch all the remaining ones concurrently
+            if limit > -1:
+                last_page = min(last_page, meta_data['current_page'] + limit - current_pass)
+            async for data in iter_pages_concurrently(
+                dataset,
+                session,
+                range(next_page, last_page + 1),
+                semaphore,
+                query_params=query_params,
+                base_endpoint=base_endpoint,
+            ):
+                yield data
+            return
+        new_page = next_page
+
+
+async def fetch_page(
+    dataset: str,
+    data_list: List[dict],
+    session: ClientSession,
+    limit,
+    current_pass: int,
+    new_page=1,
+    delay_counter=0,
+    *,
+    query_params=None,
+) -> List[dict]:
+    """
+    Fetches data from AirCall API and appends all the pages to data_list
 
-    except AircallRateLimitExhaustedException as a:
-        reset_timestamp = int(a.args[0])
-        delay = reset_timestamp - (int(datetime.timestamp(datetime.utcnow())) + 1)
-        logging.getLogger(__name__).info(f'Rate limit reached, pausing {delay} seconds')
-        time.sleep(delay)
-        logging.getLogger(__name__).info('Extraction restarted')
-        data_list = await fetch_page(
+    dependent on existence of other pages and call limit
+    """
+    data_list += [
+        data
+        async for data in iter_pages(
             dataset,
-            data_list,
             session,
             limit,
             current_pass,
@@ -148,10 +196,59 @@ async def fetch_page(
             delay_counter,
             query_params=query_params,
         )
-
+    ]
     return data_list
 
 
+async def iter_pages_concurrently(
+    dataset: str,
+    session: ClientSession,
+    pages: Iterable[int],
+    semaphore: asyncio.Semaphore,
+    *,
+    query_params=None,
+    base_endpoint: Optional[str] = None,
+) -> AsyncIterator[dict]:
+    """
+    Fetches several pages of a dataset from AirCall API at the same time
+
+    pages are yielded in order, each as soon as it and the previous ones are received
+    the number of simultaneous requests is bounded by the semaphore
+    """
+
+    if base_endpoint is None:
+        base_endpoint = get_base_endpoint(dataset)
+
+    async def fetch_one_page(page: int) -> dict:
+        async with semaphore:
+            return await fetch_single_page(
+                dataset, session, page, query_params=query_params, base_endpoint=base_endpoint
+            )
+
+    tasks = [asyncio.ensure_future(fetch_one_page(page)) for page in pages]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        # nothing left to fetch if the iteration stopped early
+        for task in tasks:
+            task.cancel()
+
+
+def get_base_endpoint(dataset: str) -> str:
+    """Builds the URL of the pages of a dataset, to which only the page number is appended"""
+    return f'{BASE_ROUTE}/{dataset}?per_page={PER_PAGE}&page='
+
+
+def get_last_page(meta_data: dict) -> Optional[int]:
+    """Computes the number of the last page from the response metadata, if available"""
+    total = meta_data.get('total')
+    per_page = meta_data.get('per_page')
+    if total is None or not per_page:
+        return None
+    return math.ceil(total / per_page)
+
+
 async def fetch(new_endpoint, session: ClientSession, query_params=None) -> dict:
     """The basic fetch function"""
     async with session.get(new_endpoint, params=query_params) as res:
@@ -160,7 +257,10 @@ async def fetch(new_endpoint, session: ClientSession, query_params=None) -> dict
             raise AircallRateLimitExhaustedException(rate_limit_reset)
         except KeyError:
             pass
-        return await res.json()
+        if orjson is None:
+            return await res.json()
+        # orjson decodes the raw bytes directly, without going through a str
+        return orjson.loads(await res.read())
 
 
 class AircallDataSource(ToucanDataSource):
@@ -180,6 +280,7 @@ class AircallConnector(ToucanConnector):
     data_source_model: AircallDataSource
 
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_connector_secrets_form() -> ConnectorSecretsForm:
         return ConnectorSecretsForm(
             documentation_md=(Path(os.path.dirname(__file__)) / 'doc.md').read_text(),
@@ -220,75 +321,76 @@ class AircallConnector(ToucanConnector):
             return self.provided_token
         return self.__dict__['_oauth2_connector'].get_access_token()
 
-    async def _fetch(self, url, headers=None, query_params=None):
+    def _open_session(self) -> ClientSession:
+        """
+        Opens a session sending the access token to Aircall.
+        It is meant to be used as a context manager for the duration of a run,
+        so that all the requests of the run share its connections.
+        """
+        access_token = self.get_access_token()
+        if not access_token:
+            raise NoCredentialsError(NO_CREDENTIALS_ERROR)
+        return ClientSession(headers={'Authorization': f'Bearer {access_token}'})
+
+    async def _fetch(self, url, query_params=None):
         """Build the final request along with headers."""
-        async with ClientSession(headers=headers) as session:
+        async with self._open_session() as session:
             return await fetch(url, session, query_params=query_params)
 
     def _run_fetch(self, url):
         """Run loop."""
-        access_token = self.get_access_token()
-        if not access_token:
-            raise NoCredentialsError(NO_CREDENTIALS_ERROR)
-        headers = {'Authorization': f'Bearer {access_token}'}
-
         loop = get_loop()
-        future = asyncio.ensure_future(self._fetch(url, headers))
+        future = asyncio.ensure_future(self._fetch(url))
         return loop.run_until_complete(future)
 
     async def _get_data(
         self, dataset: str, limit, query_params=None
     ) -> Tuple[List[dict], List[dict]]:
         """Triggers fetches for data and does preliminary filtering process"""
-        access_token = self.get_access_token()
-        if not access_token:
-            raise NoCredentialsError(NO_CREDENTIALS_ERROR)
-        headers = {'Authorization': f'Bearer {access_token}'}
-
-        async with ClientSession(headers=headers) as session:
-            team_data, variable_data = await asyncio.gather(
-                fetch_page(
+        # both datasets are fetched at the same time, within the same bound of simultaneous requests
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+        # pages are formatted as soon as they are received, while the next ones are fetched
+        async def get_team_data(session: ClientSession) -> List[dict]:
+            format_team = DICTIONARY_OF_FORMATTERS['teams']
+            return [
+                team_member
+                async for data in iter_pages(
                     'teams',
-                    [],
                     session,
                     limit,
-                    0,
                     query_params=None,  # for now we don't provide param while querying the teams endpoint
-                ),
-                fetch_page(dataset, [], session, limit, 0, query_params=query_params),
+                    semaphore=semaphore,
+                )
+                for team_obj in data['teams']
+                for team_member in format_team(team_obj)
+            ]
+
+        async def get_variable_data(session: ClientSession) -> List[dict]:
+            format_variable = DICTIONARY_OF_FORMATTERS.get(
+                dataset, DICTIONARY_OF_FORMATTERS['users']
+            )
+            return [
+                format_variable(obj)
+                async for data in iter_pages(
+                    dataset, session, limit, query_params=query_params, semaphore=semaphore
+                )
+                for obj in data[dataset]
+            ]
+
+        # both datasets are fetched through the same connections
+        async with self._open_session() as session:
+            team_response_list, variable_response_list = await asyncio.gather(
+                get_team_data(session), get_variable_data(session)
             )
-            team_response_list = []
-            variable_response_list = []
-            if len(team_data) > 0:
-                for data in team_data:
-                    for team_obj in data['teams']:
-                        team_response_list += DICTIONARY_OF_FORMATTERS['teams'](team_obj)
-            if len(variable_data) > 0:
-                for data in variable_data:
-                    variable_response_list += [
-                        DICTIONARY_OF_FORMATTERS.get(dataset, 'users')(obj) for obj in data[dataset]
-                    ]
-            return team_response_list, variable_response_list
+        return team_response_list, variable_response_list
 
     async def _get_tags(self, dataset: str, limit) -> List[dict]:
         """Triggers fetches for tags and does preliminary filtering process"""
-        access_token = self.get_access_token()
-        if not access_token:
-            raise NoCredentialsError(NO_CREDENTIALS_ERROR)
-        headers = {'Authorization': f'Bearer {access_token}'}
-
-        async with ClientSession(headers=headers) as session:
-            raw_data = await fetch_page(
-                dataset,
-                [],
-                session,
-                limit,
-                1,
-            )
-            tags_data_list = []
-            for data in raw_data:
-                tags_data_list += data['tags']
-            return tags_data_list
+        async with self._open_session() as session:
+            return [
+                tag async for data in iter_pages(dataset, session, limit, 1) for tag in data['tags']
+            ]
 
     def run_fetches(self, dataset, limit, query_params=None) -> Tuple[List[dict], List[dict]]:
         """sets up event loop and fetches for 'calls' and 'users' datasets"""
@@ -312,19 +414,25 @@ class AircallConnector(ToucanConnector):
         limit = data_source.limit
 
         if dataset == 'tags':
-            non_empty_df = pd.DataFrame([])
-            if limit != 0:
-                res = self.run_fetches_for_tags(dataset, limit)
-                non_empty_df = pd.DataFrame(res)
-            return pd.concat([empty_df, non_empty_df])
+            if limit == 0:
+                return empty_df
+            res = self.run_fetches_for_tags(dataset, limit)
+            return pd.DataFrame.from_records(res, columns=empty_df.columns)
         else:
-            team_data = pd.DataFrame([])
-            variable_data = pd.DataFrame([])
+            team_data = []
+            variable_data = []
             if limit != 0:
                 team_data, variable_data = self.run_fetches(dataset, limit, query_params)
 
+            # the formatted records always have the same keys, so there's no need
+            # to let pandas infer the columns from each of them
             return build_df(
-                dataset, [empty_df, pd.DataFrame(team_data), pd.DataFrame(variable_data)]
+                dataset,
+                [
+                    empty_df,
+                    pd.DataFrame.from_records(team_data, columns=FORMATTED_COLUMNS['teams']),
+                    pd.DataFrame.from_records(variable_data, columns=FORMATTED_COLUMNS[dataset]),
+                ],
             )
 
     def get_status(self) -> ConnectorStatus:
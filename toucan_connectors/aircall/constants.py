@@ -16,5 +16,22 @@ COLUMN_DICTIONARY = {
     'users': ['team', 'user_id', 'user_name', 'user_created_at'],
 }
 
+# columns of the records built by the formatters of helpers.DICTIONARY_OF_FORMATTERS
+FORMATTED_COLUMNS = {
+    'calls': [
+        'id',
+        'direction',
+        'duration',
+        'answered_at',
+        'ended_at',
+        'user_id',
+        'tags',
+        'user_name',
+    ],
+    'teams': ['team', 'user_id', 'user_name', 'user_created_at'],
+    'users': ['user_id', 'user_name', 'user_created_at'],
+}
+
 MAX_RUNS = 1
 PER_PAGE = 50
+MAX_CONCURRENT_REQUESTS = 8
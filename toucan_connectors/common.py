@@ -3,6 +3,7 @@ import asyncio
 import dataclasses
 import re
 from copy import deepcopy
+from functools import lru_cache
 from typing import List, Optional, Tuple
 
 import pyjq
@@ -31,6 +32,23 @@ class NonValidVariable(Exception):
     """ Error thrown for a non valid variable in endpoint """
 
 
+@lru_cache(maxsize=1024)
+def _has_parameters(query: str) -> bool:
+    t = Environment().parse(query)
+    return bool(meta.find_undeclared_variables(t) or re.search(RE_PARAM, query))
+
+
+@lru_cache(maxsize=1024)
+def _native_template(query: str) -> Template:
+    """Compile a jinja/%()s query string once and reuse it across renders"""
+    return NativeEnvironment().from_string(re.sub(RE_PARAM, r'{{ \g<1> }}', query))
+
+
+@lru_cache(maxsize=1024)
+def _strict_template(variable: str) -> Template:
+    return Template('{{ %s }}' % variable, undefined=StrictUndefined)
+
+
 def nosql_apply_parameters_to_query(query, parameters, handle_errors=False):
     """
     WARNING : DO NOT USE THIS WITH VARIANTS OF SQL
@@ -38,10 +56,6 @@ def nosql_apply_parameters_to_query(query, parameters, handle_errors=False):
     https://www.owasp.org/index.php/Query_Parameterization_Cheat_Sheet
     """
 
-    def _has_parameters(query):
-        t = Environment().parse(query)
-        return meta.find_undeclared_variables(t) or re.search(RE_PARAM, query)
-
     def _prepare_parameters(p):
         if isinstance(p, str):
             return repr(p)
@@ -75,16 +89,13 @@ def nosql_apply_parameters_to_query(query, parameters, handle_errors=False):
             if not _has_parameters(query):
                 return query
 
-            # Replace param templating with jinja templating:
-            query = re.sub(RE_PARAM, r'{{ \g<1> }}', query)
-
             # Add quotes to string parameters to keep type if not complex
+            # (param templating is replaced with jinja templating first)
             clean_p = deepcopy(parameters)
-            if re.match(RE_JINJA_ALONE, query):
+            if re.match(RE_JINJA_ALONE, re.sub(RE_PARAM, r'{{ \g<1> }}', query)):
                 clean_p = _prepare_parameters(clean_p)
 
-            env = NativeEnvironment()
-            res = env.from_string(query).render(clean_p)
+            res = _native_template(query).render(clean_p)
             # NativeEnvironment's render() isn't recursive, so we need to
             # apply recursively the literal_eval by hand for lists and dicts:
             if isinstance(res, (list, dict)):
@@ -107,7 +118,7 @@ def nosql_apply_parameters_to_query(query, parameters, handle_errors=False):
                     missing_params = []
                     for m in matches:
                         try:
-                            Template('{{ %s }}' % m, undefined=StrictUndefined).render(params)
+                            _strict_template(m).render(params)
                         except Exception:
                             if handle_errors:
                                 raise NonValidVariable(f'Non valid variable {m}')
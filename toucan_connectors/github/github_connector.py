@@ -4,6 +4,7 @@ import os
 from contextlib import suppress
 from datetime import datetime
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
 
@@ -32,20 +33,19 @@ from .helpers import (
     KeyNotFoundException,
     RateLimitExhaustedException,
     dataset_formatter,
-    extraction_funcs_names,
-    extraction_funcs_pages_1,
-    extraction_funcs_pages_2,
     extraction_keys,
+    extraction_paths_names,
+    extraction_paths_pages,
     format_functions,
     get_cursor,
     get_data,
     get_errors,
     get_message,
     get_nodes,
-    get_organization,
     get_page_info,
     get_rate_limit_info,
     has_next_page,
+    pluck,
     queries_funcs_names,
     queries_funcs_pages,
 )
@@ -56,6 +56,10 @@ TOKEN_URL: str = 'https://github.com/login/oauth/access_token'
 BASE_ROUTE: str = 'https://api.github.com/graphql'
 BASE_ROUTE_REST: str = 'https://api.github.com/'
 NO_CREDENTIALS_ERROR = 'No credentials'
+MAX_CONCURRENT_QUERIES = 5
+REQUEST_TIMEOUT = 30
+ORGANIZATIONS_PER_PAGE = 100
+LOGGER = logging.getLogger(__name__)
 extraction_start_date = datetime.strftime(
     datetime.now() - relativedelta.relativedelta(years=1), '%Y-%m-%dT%H:%M:%SZ'
 )
@@ -99,6 +103,7 @@ class GithubConnector(ToucanConnector):
     data_source_model: GithubDataSource
 
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_connector_secrets_form() -> ConnectorSecretsForm:
         return ConnectorSecretsForm(
             documentation_md=(Path(os.path.dirname(__file__)) / 'doc.md').read_text(),
@@ -134,9 +139,17 @@ class GithubConnector(ToucanConnector):
             raise NoCredentialsError('No credentials')
 
         headers = {'Authorization': f'Bearer {access_token}'}
-        logging.getLogger(__name__).info('Retrieving organization')
-        data = requests.get(f'{BASE_ROUTE_REST}user/orgs', headers=headers).json()
-        return [str(x['login']) for x in data]
+        organizations = []
+        url = f'{BASE_ROUTE_REST}user/orgs?per_page={ORGANIZATIONS_PER_PAGE}'
+        # all the pages are retrieved through the same connection
+        with requests.Session() as session:
+            while url:
+                LOGGER.info('Retrieving organizations')
+                res = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+                organizations += [str(x['login']) for x in res.json()]
+                # the following pages are linked in the response headers
+                url = res.links.get('next', {}).get('url')
+        return organizations
 
     def retrieve_tokens(self, authorization_response: str):
         """
@@ -178,7 +191,7 @@ class GithubConnector(ToucanConnector):
             get_errors(data)
             get_message(data)
 
-            extracted_data = extraction_funcs_names[dataset](get_organization(get_data(data)))
+            extracted_data = pluck(data, *extraction_paths_names[dataset])
             page_info = get_page_info(extracted_data)
             names.extend([t[extraction_keys[dataset]] for t in get_nodes(extracted_data)])
 
@@ -188,7 +201,7 @@ class GithubConnector(ToucanConnector):
                     client, organization, names=names, variables=variables, dataset=dataset
                 )
         except (GithubError, KeyNotFoundException) as g:
-            logging.getLogger(__name__).error(f'Aborting query due to {g}')
+            LOGGER.error(f'Aborting query due to {g}')
 
         return names
 
@@ -235,9 +248,7 @@ class GithubConnector(ToucanConnector):
             get_message(data)
             get_errors(data)
             data_value = get_data(data)
-            extracted_data = extraction_funcs_pages_1[dataset](
-                extraction_funcs_pages_2[dataset](get_organization(data_value))
-            )
+            extracted_data = pluck(data_value, *extraction_paths_pages[dataset])
             page_info = get_page_info(extracted_data)
             formatted_data = format_functions[dataset](extracted_data, name)
 
@@ -294,7 +305,7 @@ class GithubConnector(ToucanConnector):
                 )
 
         except GithubError:
-            logging.getLogger(__name__).info('Retrying in 15 seconds')
+            LOGGER.info('Retrying in 15 seconds')
             await asyncio.sleep(15)
             retries += 1
             if retries <= retry_limit:
@@ -315,11 +326,11 @@ class GithubConnector(ToucanConnector):
                 raise GithubError('Max number of retries reached, aborting connection')
 
         except KeyNotFoundException as k:
-            logging.getLogger(__name__).error(f'{k}')
+            LOGGER.error(f'{k}')
 
         except RateLimitExhaustedException as r:
             sleep_time = r.args[0]  # Value to wait is sent within the Exception
-            logging.getLogger(__name__).info(f'Pausing until reset, waiting {sleep_time}')
+            LOGGER.info(f'Pausing until reset, waiting {sleep_time}')
             await asyncio.sleep(sleep_time)
             await self.get_pages(
                 name=name,
@@ -357,22 +368,28 @@ class GithubConnector(ToucanConnector):
         :param latest_retrieved_object a dict with object as key and entity as value e. g {'repo': 'plop', 'pr: stuff'}
         :return: a Pandas DataFrame of pull requests or team memberships
         """
-        logging.getLogger(__name__).info(f'Starting fetch for {dataset}')
+        LOGGER.info(f'Starting fetch for {dataset}')
         names = self.get_names(client=client, organization=organization, dataset=dataset)
-        subtasks = [
-            self.get_pages(
-                name=name,
-                client=client,
-                dataset=dataset,
-                organization=organization,
-                page_limit=page_limit,
-                latest_retrieved_object=latest_retrieved_object.get(name)
-                if latest_retrieved_object
-                else None,
-            )
-            for name in names[:names_limit]
-        ]
-        unformatted_data = await asyncio.gather(*subtasks)
+        # Each name is paginated on its own, but only a few of them at the same
+        # time to stay under Github's rate limits
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
+
+        async def get_pages_of(name: str) -> List[dict]:
+            async with semaphore:
+                return await self.get_pages(
+                    name=name,
+                    client=client,
+                    dataset=dataset,
+                    organization=organization,
+                    page_limit=page_limit,
+                    latest_retrieved_object=(
+                        latest_retrieved_object.get(name) if latest_retrieved_object else None
+                    ),
+                )
+
+        unformatted_data = await asyncio.gather(
+            *[get_pages_of(name) for name in names[:names_limit]]
+        )
         return dataset_formatter[dataset]([e for sublist in unformatted_data for e in sublist])
 
     def _retrieve_data(self, data_source: GithubDataSource) -> pd.DataFrame:
@@ -4,7 +4,7 @@ from typing import List
 
 import pandas as pd
 
-from toucan_connectors.common import nosql_apply_parameters_to_query
+LOGGER = logging.getLogger(__name__)
 
 
 class GithubError(Exception):
@@ -19,16 +19,9 @@ class KeyNotFoundException(Exception):
     """
 
 
-def build_query_repositories(organization: str) -> str:
-    """
-    Builds the GraphQL query to retrieve a list of repositories
-    from Github's API
-    :param organization: the organization name from which the
-    repositories data will be extracted
-    :return: graphql query with the sanitized organization name
-    """
-    return nosql_apply_parameters_to_query(
-        """query repositories($cursor: String) {
+# GraphQL queries templates, filled with the organization and repository
+# or team names by the build_query_* functions below
+QUERY_REPOSITORIES = """query repositories($cursor: String) {
           organization(login: "%(organization)s") {
             repositories(first: 90, orderBy: {field: PUSHED_AT, direction: DESC},
              after: $cursor) {
@@ -41,22 +34,10 @@ def build_query_repositories(organization: str) -> str:
               }
             }
         }
-    }""",
-        {'organization': organization},
-    )
+    }"""
 
 
-def build_query_pr(organization: str, name: str) -> str:
-    """
-    Builds the GraphQL query to retrieve a list of pull requests
-    from Github's API
-    :param organization: the organization name from which the
-    pull requests data will be extracted
-    :param name a str representing the repository to extract the PRs from
-    :return: graphql query with the sanitized organization name
-    """
-    return nosql_apply_parameters_to_query(
-        """query pr($cursor: String) {
+QUERY_PR = """query pr($cursor: String) {
           organization(login: "%(organization)s") {
             repository(name: "%(repo_name)s") {
                 name
@@ -101,21 +82,10 @@ def build_query_pr(organization: str, name: str) -> str:
                 remaining
                 resetAt
               }
-            }""",
-        {'organization': organization, 'repo_name': name},
-    )
+            }"""
 
 
-def build_query_teams(organization: str) -> str:
-    """
-    Builds the GraphQL query to retrieve a list of teams
-    from Github's API
-    :param organization: the organization name from which the
-    teams data will be extracted
-    :return: graphql query with the sanitized organization name
-    """
-    return nosql_apply_parameters_to_query(
-        """query teams($cursor: String) {
+QUERY_TEAMS = """query teams($cursor: String) {
               organization(login: "%(organization)s") {
                 teams(first: 90, orderBy: {field: NAME, direction: ASC},
                  after: $cursor) {
@@ -133,23 +103,10 @@ def build_query_teams(organization: str) -> str:
                 resetAt
               }
             }
-            """,
-        {'organization': organization},
-    )
+            """
 
 
-def build_query_members(organization: str, name: str) -> str:
-    """
-    Builds the GraphQL query to retrieve a list of team members
-    from Github's API
-    :param organization: the organization name from which the
-    members data will be extracted
-    :param team the team name from which the
-    members data will be extracted
-    :return: graphql query with sanitized organization and team names
-    """
-    return nosql_apply_parameters_to_query(
-        """
+QUERY_MEMBERS = """
     query members($cursor: String){
       organization(login: "%(organization)s") {
         team(slug: "%(team)s"){
@@ -168,9 +125,54 @@ def build_query_members(organization: str, name: str) -> str:
         }
       }
 }
-""",
-        {'organization': organization, 'team': name},
-    )
+"""
+
+
+def build_query_repositories(organization: str) -> str:
+    """
+    Builds the GraphQL query to retrieve a list of repositories
+    from Github's API
+    :param organization: the organization name from which the
+    repositories data will be extracted
+    :return: graphql query with the sanitized organization name
+    """
+    return QUERY_REPOSITORIES % {'organization': organization}
+
+
+def build_query_pr(organization: str, name: str) -> str:
+    """
+    Builds the GraphQL query to retrieve a list of pull requests
+    from Github's API
+    :param organization: the organization name from which the
+    pull requests data will be extracted
+    :param name a str representing the repository to extract the PRs from
+    :return: graphql query with the sanitized organization name
+    """
+    return QUERY_PR % {'organization': organization, 'repo_name': name}
+
+
+def build_query_teams(organization: str) -> str:
+    """
+    Builds the GraphQL query to retrieve a list of teams
+    from Github's API
+    :param organization: the organization name from which the
+    teams data will be extracted
+    :return: graphql query with the sanitized organization name
+    """
+    return QUERY_TEAMS % {'organization': organization}
+
+
+def build_query_members(organization: str, name: str) -> str:
+    """
+    Builds the GraphQL query to retrieve a list of team members
+    from Github's API
+    :param organization: the organization name from which the
+    members data will be extracted
+    :param team the team name from which the
+    members data will be extracted
+    :return: graphql query with sanitized organization and team names
+    """
+    return QUERY_MEMBERS % {'organization': organization, 'team': name}
 
 
 def format_pr_row(pr_row: dict):
@@ -186,37 +188,34 @@ def format_pr_row(pr_row: dict):
     current_record['PR Merging Date'] = pr_row.get('mergedAt')
     current_record['PR Additions'] = pr_row.get('additions')
     current_record['PR Deletions'] = pr_row.get('deletions')
-    try:
+    labels = (pr_row.get('labels') or {}).get('edges') or []
+    current_record['PR Type'] = [label['node'].get('name') for label in labels]
 
-        current_record['PR Type'] = [
-            label['node'].get('name') for label in pr_row['labels'].get('edges')
-        ]
-        edges = get_edges(pr_row.get('commits'))
-        # Here we choose to select the author of the last commit as the author of the PR
-        # It's less wrong than choosing the author of the first commit in case of rebase
-        current_record['Dev'] = edges[-1]['node']['commit']['author']['user']['login']
-
-    except (AttributeError, TypeError, KeyNotFoundException):
-        current_record['Dev'] = None
+    # Here we choose to select the author of the last commit as the author of the PR
+    # It's less wrong than choosing the author of the first commit in case of rebase
+    commits = (pr_row.get('commits') or {}).get('edges') or []
+    author = (commits[-1]['node']['commit'].get('author') or {}) if commits else {}
+    current_record['Dev'] = (author.get('user') or {}).get('login')
 
     return current_record
 
 
 def format_pr_rows(pr_nodes: dict, repo_name: str) -> List[dict]:
     """
-    A wrapper function to multiprocess the pull requests formatting
+    A wrapper function to format the pull requests of a page
     :param pr_rows: pull requests extracted from Github's API
     :param repo_name: a str representing the repository's name
     :return: a formatted dict with pull requests data
     """
 
-    pull_requests = get_nodes(pr_nodes)
-    formatted = [
-        format_pr_row(pr)
-        for pr in pull_requests
-        if pr.get('state') != 'CLOSED'  # we ignore closed PR in KPIs
-    ]
-    return [dict(r, **{'Repo Name': repo_name}) for r in formatted]
+    formatted = []
+    for pr in get_nodes(pr_nodes):
+        if pr.get('state') == 'CLOSED':  # we ignore closed PR in KPIs
+            continue
+        record = format_pr_row(pr)
+        record['Repo Name'] = repo_name
+        formatted.append(record)
+    return formatted
 
 
 def format_team_row(members: dict, team_name: str) -> dict:
@@ -226,10 +225,7 @@ def format_team_row(members: dict, team_name: str) -> dict:
     :param team_name: a str representing the team name
     :return: a dict with login as key and teams as values
     """
-    current_record = {team_name: [dev.get('node').get('login') for dev in get_edges(members)]}
-    devs = pd.DataFrame(current_record).melt()
-    devs.set_index('value', drop=True, inplace=True)
-    return devs.to_dict().get('variable')
+    return {dev.get('node').get('login'): team_name for dev in get_edges(members)}
 
 
 def format_team_df(team_rows: List[dict]) -> pd.DataFrame:
@@ -240,12 +236,31 @@ def format_team_df(team_rows: List[dict]) -> pd.DataFrame:
     :return: a formatted pandas DataFrame with login in dev column and
     list of teams in teams column
     """
-    team_df = pd.DataFrame(team_rows).transpose()
-    team_df['teams'] = team_df.values.tolist()
-    team_df['teams'] = team_df['teams'].apply(lambda x: list({t for t in x if not pd.isnull(t)}))
-    team_df.reset_index(inplace=True)
-    team_df.rename(columns={'index': 'Dev'}, inplace=True)
-    return team_df[['Dev', 'teams']]
+    memberships = pd.DataFrame(
+        [(dev, team) for row in team_rows for dev, team in row.items()], columns=['Dev', 'teams']
+    )
+    return (
+        memberships.dropna()
+        .drop_duplicates()
+        .groupby('Dev', sort=False)['teams']
+        .agg(list)
+        .reset_index()
+    )
+
+
+def pluck(data: dict, *path: str):
+    """
+    Extracts the value at the end of a path of keys in nested dicts
+    or raises an error if one of the keys is not available
+    :param data: data extracted from Github's API
+    :param path: the successive keys leading to the value
+    :return: the value found at the end of the path
+    """
+    for key in path:
+        data = data.get(key)
+        if not data:
+            raise KeyNotFoundException(f'No {key} Key Available')
+    return data
 
 
 def get_data(response: dict) -> dict:
@@ -254,11 +269,7 @@ def get_data(response: dict) -> dict:
     :param response: a response from Github's API
     :return: the content of the Data field in response if exists
     """
-    data = response.get('data')
-    if data:
-        return data
-    else:
-        raise KeyNotFoundException('No Data Key Available')
+    return pluck(response, 'data')
 
 
 def get_organization(data: dict) -> dict:
@@ -267,11 +278,7 @@ def get_organization(data: dict) -> dict:
     :param data: data extracted from Github's API
     :return: the content of the organization field in response if exists
     """
-    organization = data.get('organization')
-    if organization:
-        return organization
-    else:
-        raise KeyNotFoundException('No Organization Key Available')
+    return pluck(data, 'organization')
 
 
 def get_repositories(organization: dict) -> dict:
@@ -281,12 +288,7 @@ def get_repositories(organization: dict) -> dict:
     :param organization: an organization extracted from Github's API
     :return: the content of the repositories field in response if exists
     """
-
-    repositories = organization.get('repositories')
-    if repositories:
-        return repositories
-    else:
-        raise KeyNotFoundException('No repositories Key Available')
+    return pluck(organization, 'repositories')
 
 
 def get_repository(organization: dict) -> dict:
@@ -295,11 +297,7 @@ def get_repository(organization: dict) -> dict:
     :param organization: an organization extracted from Github's API
     :return: the content of the repository field in response if exists
     """
-    repository = organization.get('repository')
-    if repository:
-        return repository
-    else:
-        raise KeyNotFoundException('No repository Key Available')
+    return pluck(organization, 'repository')
 
 
 def get_teams(organization: dict):
@@ -308,11 +306,7 @@ def get_teams(organization: dict):
     :param organization: an organization extracted from Github's API
     :return: the content of the teams field in response if exists
     """
-    teams = organization.get('teams')
-    if teams:
-        return teams
-    else:
-        raise KeyNotFoundException('No teams Key Available')
+    return pluck(organization, 'teams')
 
 
 def get_nodes(response: dict) -> List[dict]:
@@ -331,11 +325,7 @@ def get_edges(data: dict) -> List[dict]:
     :param data: data extracted from Github's API
     :return: the content of the Edges field in response if exists
     """
-    edges = data.get('edges')
-    if edges:
-        return edges
-    else:
-        raise KeyNotFoundException('No Edges Key Available')
+    return pluck(data, 'edges')
 
 
 def get_pull_requests(repo: dict) -> dict:
@@ -344,12 +334,7 @@ def get_pull_requests(repo: dict) -> dict:
     :param repo: a repo extracted from Github's API
     :return: the content of the pull_requests field in response if exists
     """
-    pull_requests = repo.get('pullRequests')
-
-    if pull_requests:
-        return pull_requests
-    else:
-        raise KeyNotFoundException('No Pull Requests Available')
+    return pluck(repo, 'pullRequests')
 
 
 def get_team(organization: dict) -> dict:
@@ -358,11 +343,7 @@ def get_team(organization: dict) -> dict:
     :param organization: organization data extracted from Github's API
     :return: the content of the team field in response if exists
     """
-    team = organization.get('team')
-    if team:
-        return team
-    else:
-        raise KeyNotFoundException
+    return pluck(organization, 'team')
 
 
 def get_members(team: dict) -> dict:
@@ -371,11 +352,7 @@ def get_members(team: dict) -> dict:
     :param team: a team extracted from Github's API
     :return: the content of the members field in response if exists
     """
-    members = team.get('members')
-    if members:
-        return members
-    else:
-        raise KeyNotFoundException('No Members Available')
+    return pluck(team, 'members')
 
 
 def get_page_info(page: dict) -> dict:
@@ -384,11 +361,7 @@ def get_page_info(page: dict) -> dict:
     :param page: a page extracted from Github's API
     :return: a dict with pagination data
     """
-    page_info = page.get('pageInfo')
-    if page_info:
-        return page_info
-    else:
-        raise KeyNotFoundException('No PageInfo Key available')
+    return pluck(page, 'pageInfo')
 
 
 def get_errors(data: dict):
@@ -400,7 +373,7 @@ def get_errors(data: dict):
     errors = data.get('errors')
     if errors:
         for error in errors:
-            logging.getLogger(__name__).error(f'A Github error occured:' f' {error}')
+            LOGGER.error(f'A Github error occured:' f' {error}')
         raise GithubError(f'Retrying query due to {errors}')
 
 
@@ -442,7 +415,7 @@ def get_message(response: dict):
     message = response.get('message')
 
     if message:
-        logging.getLogger(__name__).error(f'A Github error occured:' f' {message}')
+        LOGGER.error(f'A Github error occured:' f' {message}')
         raise GithubError(f'API sent {message}')
 
 
@@ -463,15 +436,20 @@ def get_rate_limit_info(response: dict):
     rate_limit_info = response.get('rateLimit')
     if rate_limit_info:
         if rate_limit_info['remaining'] < 100:  # Raise the Exception Before reaching the limit
-            logging.getLogger(__name__).info('Rate limit exhausted')
+            LOGGER.info('Rate limit exhausted')
             resetAt_date = datetime.strptime(rate_limit_info['resetAt'], '%Y-%m-%dT%H:%M:%SZ')
             timetowait = (resetAt_date - datetime.utcnow()).seconds + 1  # adding 1 sec to round up
             raise RateLimitExhaustedException(timetowait)
 
 
-extraction_funcs_names = {'pull requests': get_repositories, 'teams': get_teams}
-extraction_funcs_pages_1 = {'pull requests': get_pull_requests, 'teams': get_members}
-extraction_funcs_pages_2 = {'pull requests': get_repository, 'teams': get_team}
+extraction_paths_names = {
+    'pull requests': ('data', 'organization', 'repositories'),
+    'teams': ('data', 'organization', 'teams'),
+}
+extraction_paths_pages = {
+    'pull requests': ('organization', 'repository', 'pullRequests'),
+    'teams': ('organization', 'team', 'members'),
+}
 queries_funcs_names = {'pull requests': build_query_repositories, 'teams': build_query_teams}
 queries_funcs_pages = {'pull requests': build_query_pr, 'teams': build_query_members}
 extraction_keys = {'pull requests': 'name', 'teams': 'slug'}
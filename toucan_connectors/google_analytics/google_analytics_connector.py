@@ -1,7 +1,11 @@
+from collections import defaultdict
+from functools import lru_cache
 from typing import List
 
+import numpy as np
 import pandas as pd
-from apiclient.discovery import build
+import requests
+from apiclient.discovery import DISCOVERY_URI, build_from_document
 from oauth2client.service_account import ServiceAccountCredentials
 from pydantic import BaseModel, Field
 
@@ -12,6 +16,10 @@ from toucan_connectors.toucan_connector import ToucanConnector, ToucanDataSource
 API = 'analyticsreporting'
 SCOPE = 'https://www.googleapis.com/auth/analytics.readonly'
 VERSION = 'v4'
+# batchGet accepts at most 5 report requests per call
+MAX_REPORT_REQUESTS = 5
+# how the values of each metric type are parsed, and into which dtype
+METRIC_PARSERS = {'INTEGER': (int, np.int64), 'FLOAT': (float, np.float64)}
 
 
 class Dimension(BaseModel):
@@ -114,49 +122,117 @@ class ReportRequest(BaseModel):
     hideValueRanges: bool = False
 
 
-def get_dict_from_response(report, request_date_ranges):
+def parse_metric_values(values: np.ndarray, metric_type: str) -> np.ndarray:
+    """
+    Parse the string values of a metric into a typed array, filled straight from
+    the parsed values. Values of other types are kept as strings.
+    """
+    if metric_type not in METRIC_PARSERS:
+        return values
+    parse, dtype = METRIC_PARSERS[metric_type]
+    parsed = np.fromiter(map(parse, values.ravel()), dtype=dtype, count=values.size)
+    return parsed.reshape(values.shape)
+
+
+def get_dict_from_response(report, date_ranges):
+    """
+    Flatten a report into columns: one value per (row, date range, metric),
+    built with numpy arrays rather than one dict per cell.
+    `date_ranges` are the (start date, end date) pairs of the request.
+    """
     columnHeader = report.get('columnHeader', {})
     dimensionHeaders = columnHeader.get('dimensions', [])
     metricHeaders = columnHeader.get('metricHeader', {}).get('metricHeaderEntries', [])
     rows = report.get('data', {}).get('rows', [])
 
-    all_rows = []
-    for row_index, row in enumerate(rows):
-        dimensions = row.get('dimensions', [])
-        dateRangeValues = row.get('metrics', [])
+    if not rows or not metricHeaders:
+        return {}
 
-        for i, values in enumerate(dateRangeValues):
-            for metricHeader, value in zip(metricHeaders, values.get('values')):
-                row_dict = {
-                    'row_index': row_index,
-                    'date_range_id': i,
-                    'metric_name': metricHeader.get('name'),
-                }
+    # shape: (n_rows, n_date_ranges, n_metrics)
+    values = np.array(
+        [[dr_values.get('values') for dr_values in row.get('metrics', [])] for row in rows],
+        dtype=object,
+    )
+    n_rows, n_date_ranges, n_metrics = values.shape
+    cells_per_row = n_date_ranges * n_metrics
+
+    metric_values = [
+        parse_metric_values(values[..., j], metricHeader.get('type'))
+        for j, metricHeader in enumerate(metricHeaders)
+    ]
 
-                if request_date_ranges and (len(request_date_ranges) >= i):
-                    row_dict['start_date'] = request_date_ranges[i].startDate
-                    row_dict['end_date'] = request_date_ranges[i].endDate
+    date_range_id = np.tile(np.repeat(np.arange(n_date_ranges, dtype=np.int16), n_metrics), n_rows)
+    metric_names = np.array(
+        [metricHeader.get('name') for metricHeader in metricHeaders], dtype=object
+    )
+    columns = {
+        'row_index': np.repeat(np.arange(n_rows, dtype=np.int32), cells_per_row),
+        'date_range_id': date_range_id,
+        'metric_name': np.tile(metric_names, n_rows * n_date_ranges),
+    }
 
-                if metricHeader.get('type') == 'INTEGER':
-                    row_dict['metric_value'] = int(value)
-                elif metricHeader.get('type') == 'FLOAT':
-                    row_dict['metric_value'] = float(value)
-                else:
-                    row_dict['metric_value'] = value
+    if date_ranges:
+        # dates are only known for the requested ranges, the others are left empty
+        missing_ranges = [(None, None)] * max(n_date_ranges - len(date_ranges), 0)
+        start_dates, end_dates = zip(*date_ranges, *missing_ranges)
+        columns['start_date'] = np.array(start_dates, dtype=object)[date_range_id]
+        columns['end_date'] = np.array(end_dates, dtype=object)[date_range_id]
 
-                for dimension_name, dimension_value in zip(dimensionHeaders, dimensions):
-                    row_dict[dimension_name] = dimension_value
+    columns['metric_value'] = np.stack(metric_values, axis=-1).reshape(-1)
 
-                all_rows.append(row_dict)
+    dimensions = np.array([row.get('dimensions', []) for row in rows], dtype=object)
+    columns.update(zip(dimensionHeaders, np.repeat(dimensions, cells_per_row, axis=0).T))
 
-    return all_rows
+    return columns
 
 
-def get_query_results(service, report_request):
-    response = service.reports().batchGet(body={'reportRequests': report_request.dict()}).execute()
+def get_query_results(service, report_request: dict):
+    response = service.reports().batchGet(body={'reportRequests': report_request}).execute()
     return response.get('reports', [])[0]
 
 
+def get_pages_results(service, report_request: dict, page_tokens):
+    """Fetch several pages of the same report with a single batchGet call"""
+    report_requests = [{**report_request, 'pageToken': token} for token in page_tokens]
+    response = service.reports().batchGet(body={'reportRequests': report_requests}).execute()
+    return response.get('reports', [])
+
+
+def get_page_tokens(report, page_token):
+    """
+    Page tokens are row offsets: when the report gives its row count, all the
+    remaining pages can be requested upfront. Returns None otherwise.
+    The offsets step by the length of the page actually returned (`page_token`
+    being the one it was requested with), as the API may return fewer rows
+    than the requested page size.
+    """
+    row_count = report.get('data', {}).get('rowCount')
+    next_page_token = report.get('nextPageToken')
+    if (
+        row_count is None
+        or next_page_token is None
+        or not next_page_token.isdigit()
+        or (page_token and not page_token.isdigit())
+    ):
+        return None
+    page_length = int(next_page_token) - int(page_token or 0)
+    if page_length <= 0:
+        return None
+    return [str(offset) for offset in range(int(next_page_token), row_count, page_length)]
+
+
+@lru_cache(maxsize=1)
+def get_discovery_document() -> str:
+    """
+    Returns the discovery document of the reporting API. It only depends on the
+    API and its version, so it is fetched once for all the connectors instead
+    of every time a service is built.
+    """
+    res = requests.get(DISCOVERY_URI.format(api=API, apiVersion=VERSION))
+    res.raise_for_status()
+    return res.text
+
+
 class GoogleAnalyticsDataSource(ToucanDataSource):
     report_request: ReportRequest = Field(
         ...,
@@ -187,24 +263,41 @@ class GoogleAnalyticsConnector(ToucanConnector):
     )
 
     def _retrieve_data(self, data_source: GoogleAnalyticsDataSource) -> pd.DataFrame:
+        # the service's http client is not thread-safe: each fetch builds its own
         credentials = ServiceAccountCredentials.from_json_keyfile_dict(
             self.credentials.dict(), self.scope
         )
-        service = build(API, VERSION, credentials=credentials)
-        report_request = ReportRequest(
-            **nosql_apply_parameters_to_query(
-                data_source.report_request.dict(), data_source.parameters
-            )
-        )
-        report = get_query_results(service, report_request)
-        reports_data = [pd.DataFrame(get_dict_from_response(report, report_request.dateRanges))]
-
-        while 'nextPageToken' in report:
-            report_request.pageToken = report['nextPageToken']
-
-            report = get_query_results(service, report_request)
-            reports_data.append(
-                pd.DataFrame(get_dict_from_response(report, report_request.dateRanges))
-            )
-
-        return pd.concat(reports_data)
+        service = build_from_document(get_discovery_document(), credentials=credentials)
+        query = data_source.report_request.dict()
+        body = nosql_apply_parameters_to_query(query, data_source.parameters)
+        if body == query:
+            # nothing was templated: the data source has already validated the request
+            report_request = data_source.report_request
+        else:
+            report_request = ReportRequest(**body)
+            body = report_request.dict()
+
+        columns = defaultdict(list)
+        date_ranges = [(dr.startDate, dr.endDate) for dr in report_request.dateRanges or []]
+
+        def add_report_columns(report):
+            for name, values in get_dict_from_response(report, date_ranges).items():
+                columns[name].append(values)
+
+        # only the page token changes from one page to another
+        report = get_query_results(service, body)
+        add_report_columns(report)
+
+        page_tokens = get_page_tokens(report, body['pageToken'])
+        if page_tokens is not None:
+            for i in range(0, len(page_tokens), MAX_REPORT_REQUESTS):
+                chunk = page_tokens[i : i + MAX_REPORT_REQUESTS]
+                for report in get_pages_results(service, body, chunk):
+                    add_report_columns(report)
+        else:
+            while 'nextPageToken' in report:
+                body['pageToken'] = report['nextPageToken']
+                report = get_query_results(service, body)
+                add_report_columns(report)
+
+        return pd.DataFrame({name: np.concatenate(values) for name, values in columns.items()})
@@ -4,6 +4,7 @@
 import asyncio
 import os
 from contextlib import suppress
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, Dict, Optional, Type
 
@@ -102,6 +103,7 @@ class GoogleSheets2Connector(ToucanConnector):
     _baseroute = 'https://sheets.googleapis.com/v4/spreadsheets/'
 
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_connector_secrets_form() -> ConnectorSecretsForm:
         return ConnectorSecretsForm(
             documentation_md=(Path(os.path.dirname(__file__)) / 'doc.md').read_text(),
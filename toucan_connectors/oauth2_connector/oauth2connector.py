@@ -1,5 +1,6 @@
 import json
 from abc import ABC, abstractmethod
+from datetime import datetime
 from time import time
 from typing import Any
 from urllib import parse as url_parse
@@ -8,6 +9,9 @@ from authlib.common.security import generate_token
 from authlib.integrations.requests_client import OAuth2Session
 from pydantic import BaseModel, SecretStr
 
+# tokens expiring sooner than that (in seconds) are always checked in the secrets keeper
+TOKEN_CACHE_LEEWAY = 30
+
 
 class SecretsKeeper(ABC):
     @abstractmethod
@@ -29,8 +33,9 @@ class OAuth2ConnectorConfig(BaseModel):
 
 
 class OAuth2Connector:
-    init_params = ['secrets_keeper', 'redirect_uri'] + list(
-        OAuth2ConnectorConfig.schema()['properties'].keys()
+    # a frozenset, as connectors check each of their init kwargs against it
+    init_params = frozenset(
+        ['secrets_keeper', 'redirect_uri', *OAuth2ConnectorConfig.schema()['properties']]
     )
 
     def __init__(
@@ -50,6 +55,9 @@ class OAuth2Connector:
         self.secrets_keeper = secrets_keeper
         self.token_url = token_url
         self.redirect_uri = redirect_uri
+        self._refresh_client = None
+        # (access_token, expires_at) of the last token seen, if it has an expiration date
+        self._cached_token = None
 
     def build_authorization_url(self, **kwargs) -> str:
         """Build an authorization request that will be sent to the client."""
@@ -65,6 +73,7 @@ class OAuth2Connector:
         )
 
         self.secrets_keeper.save(self.auth_flow_id, {'state': state})
+        self._cached_token = None
         return uri
 
     def retrieve_tokens(self, authorization_response: str, **kwargs):
@@ -78,9 +87,9 @@ class OAuth2Connector:
         saved_flow = self.secrets_keeper.load(self.auth_flow_id)
         if saved_flow is None:
             raise AuthFlowNotFound()
-        assert (
-            json.loads(saved_flow['state'])['token'] == json.loads(url_params['state'][0])['token']
-        )
+        saved_state = json.loads(saved_flow['state'])
+        if saved_state['token'] != json.loads(url_params['state'][0])['token']:
+            raise InvalidOAuth2State()
 
         token = client.fetch_token(
             self.token_url,
@@ -90,24 +99,50 @@ class OAuth2Connector:
             **kwargs,
         )
         self.secrets_keeper.save(self.auth_flow_id, token)
+        self._cached_token = None
 
     def get_access_token(self) -> str:
         """
         Returns the access_token to use to access resources
         If necessary, this token will be refreshed
         """
+        if self._cached_token is not None:
+            access_token, expires_at = self._cached_token
+            if expires_at - time() > TOKEN_CACHE_LEEWAY:
+                return access_token
+
         token = self.secrets_keeper.load(self.auth_flow_id)
 
         if 'expires_at' in token and token['expires_at'].timestamp() < time():
             if 'refresh_token' not in token:
                 raise NoOAuth2RefreshToken
-            client = OAuth2Session(
+            new_token = self._get_refresh_client().refresh_token(
+                self.token_url, refresh_token=token['refresh_token']
+            )
+            self.secrets_keeper.save(self.auth_flow_id, new_token)
+            token = new_token
+
+        self._cache_token(token)
+        return token['access_token']
+
+    def _cache_token(self, token: dict):
+        """Keep the access_token in memory until it expires, if it has an expiration date"""
+        expires_at = token.get('expires_at')
+        if isinstance(expires_at, datetime):
+            expires_at = expires_at.timestamp()
+        self._cached_token = None if expires_at is None else (token['access_token'], expires_at)
+
+    def _get_refresh_client(self) -> OAuth2Session:
+        """
+        Returns the session used to refresh tokens, created once and shared
+        by every refresh so that its connection gets reused
+        """
+        if self._refresh_client is None:
+            self._refresh_client = OAuth2Session(
                 client_id=self.config.client_id,
                 client_secret=self.config.client_secret.get_secret_value(),
             )
-            new_token = client.refresh_token(self.token_url, refresh_token=token['refresh_token'])
-            self.secrets_keeper.save(self.auth_flow_id, new_token)
-        return self.secrets_keeper.load(self.auth_flow_id)['access_token']
+        return self._refresh_client
 
 
 class NoOAuth2RefreshToken(Exception):
@@ -120,3 +155,9 @@ class AuthFlowNotFound(Exception):
     """
     Raised when we could not match the given state
     """
+
+
+class InvalidOAuth2State(Exception):
+    """
+    Raised when the received state does not match the one saved for the auth flow
+    """
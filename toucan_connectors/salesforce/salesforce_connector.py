@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -17,6 +18,11 @@ from toucan_connectors.toucan_connector import (
     ToucanDataSource,
 )
 
+try:
+    import orjson
+except ImportError:  # the 'salesforce' extra is optional: fall back on requests' json decoding
+    orjson = None
+
 AUTHORIZATION_URL = 'https://login.salesforce.com/services/oauth2/authorize'
 SCOPE = 'full api refresh_token'
 # In Sandbox case, TOKEN_URL must be set to https://login.salesforce.com/services/oauth2/token
@@ -52,6 +58,7 @@ class SalesforceConnector(ToucanConnector):
     )
 
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_connector_secrets_form() -> ConnectorSecretsForm:
         return ConnectorSecretsForm(
             documentation_md=(Path(os.path.dirname(__file__)) / 'doc.md').read_text(),
@@ -110,27 +117,30 @@ class SalesforceConnector(ToucanConnector):
     def generate_rows(
         self, session: Session, data_source: SalesforceDataSource, endpoint: str, params={}
     ):
-        results = self.make_request(session, data_source, data=params, endpoint=endpoint)
-        try:
-            results.get('records', None)
-            records = [
-                {k: v for k, v in d.items() if k != 'attributes'}
-                for d in results.get('records', None)
-            ]
-            next_page = results.get('nextRecordsUrl', None)
-            if records:
-                if next_page:
-                    records += self.generate_rows(session, data_source, endpoint=next_page)
-            return records
-        except AttributeError:
-            error = results[0]['errorCode']
-            raise SalesforceApiError(error)
+        records = []
+        while endpoint:
+            results = self.make_request(session, data_source, data=params, endpoint=endpoint)
+            try:
+                page_records = results.get('records', None)
+            except AttributeError:
+                error = results[0]['errorCode']
+                raise SalesforceApiError(error)
+            if not page_records:
+                break
+            # records were just decoded: drop their metadata in place instead of copying them
+            for record in page_records:
+                record.pop('attributes', None)
+            records += page_records
+            endpoint, params = results.get('nextRecordsUrl', None), {}
+        return records
 
     def make_request(
         self, session: Session, data_source: SalesforceDataSource, endpoint: str, data={}
     ):
-        r = session.request('GET', url=f'{self.instance_url}/{endpoint}', params=data).json()
-        return r
+        res = session.request('GET', url=f'{self.instance_url}/{endpoint}', params=data)
+        if orjson is None:
+            return res.json()
+        return orjson.loads(res.content)
 
     def get_status(self) -> ConnectorStatus:
         """
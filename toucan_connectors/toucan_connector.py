@@ -4,7 +4,7 @@ import os
 import socket
 from abc import ABCMeta, abstractmethod
 from enum import Enum
-from functools import reduce, wraps
+from functools import lru_cache, reduce, wraps
 from typing import Iterable, List, NamedTuple, Optional, Type
 
 import pandas as pd
@@ -64,6 +64,16 @@ class ToucanDataSource(BaseModel):
         return cls.schema()
 
 
+@lru_cache(maxsize=None)
+def _tny_parameter_names(policy_cls: type) -> tuple:
+    """list the `tny_*` attributes of a retry policy class, computed once per class.
+    The "after" hook is left out as it is handled separately in `retry_decorator`
+    """
+    return tuple(
+        attr for attr in dir(policy_cls) if attr.startswith('tny_') and attr != 'tny_after'
+    )
+
+
 class RetryPolicy(BaseModel):
     """Generic "retry" policy management.
 
@@ -130,13 +140,12 @@ class RetryPolicy(BaseModel):
     def retry_decorator(self):
         """build the `tenaticy.retry` decorator corresponding to policy"""
         tny_kwargs = {}
-        for attr in dir(self):
-            # the "after" hook is handled separately later to plug it only if
-            # there is an actual retry policy
-            if attr.startswith('tny_') and attr != 'tny_after':
-                paramvalue = getattr(self, attr)
-                if paramvalue is not None:
-                    tny_kwargs[attr[4:]] = paramvalue
+        # the "after" hook is handled separately later to plug it only if
+        # there is an actual retry policy
+        for attr in _tny_parameter_names(type(self)):
+            paramvalue = getattr(self, attr)
+            if paramvalue is not None:
+                tny_kwargs[attr[4:]] = paramvalue
         if tny_kwargs:
             # plug the "after" hook if there's one
             if self.tny_after:
@@ -175,6 +184,12 @@ class ConnectorSecretsForm(BaseModel):
     documentation_md: str = Field(description='This field contains documentation as a md string')
     secrets_schema: dict = Field(description='The schema for the configuration form')
 
+    class Config:
+        # connectors build their form once and hand the same instance to every caller,
+        # so its fields can't be reassigned. This is shallow: secrets_schema is still
+        # the dict pydantic caches for the config model, shared and not to be mutated.
+        allow_mutation = False
+
 
 def get_connector_secrets_form(cls) -> Optional[ConnectorSecretsForm]:
     """